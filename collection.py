@@ -1,37 +1,113 @@
 """
-Module for collecting OHLCV data through yfinance and saving it to CSV files.
+Module for collecting OHLCV data through yfinance and saving it to Parquet files.
 """
 
+import os
+import time
+import functools
 import yfinance as yf
+from yfinance.exceptions import YFRateLimitError
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 
+PRICE_COLS = ['Open', 'High', 'Low', 'Close']
+
+# Index constituents change at most quarterly, so a weekly cache is safe
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "qtrade")
+CACHE_TTL = 7 * 24 * 60 * 60
+
+# Shared keep-alive session so repeated HTTPS fetches reuse connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                      max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# Yahoo rate limits are retried this many times, doubling the wait (seconds) each time
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF = 2.0
+
+# Parquet schema metadata key recording the interval of saved bars
+INTERVAL_METADATA_KEY = b'qtrade.interval'
+
+# Prices don't need double precision; float32 halves memory traffic
+OHLCV_SCHEMA = pa.schema(
+    [('Ticker', pa.dictionary(pa.int32(), pa.string())), ('Date', pa.timestamp('ns'))]
+    + [(col, pa.float32()) for col in PRICE_COLS]
+    + [('Volume', pa.int64())]
+)
+
+
+def fetch_constituents_csv(url, headers, cache_path):
+    """
+    Fetch an index constituent CSV, reusing a recent copy cached on disk.
+    Args:
+        url (str): URL of the constituent CSV.
+        headers (dict): HTTP headers to send with the request.
+        cache_path (str): Path of the on-disk cache file.
+    Returns:
+        pd.DataFrame: Constituent table with a 'Symbol' column.
+    """
+    if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < CACHE_TTL:
+        print(f"Using cached constituents from '{cache_path}'")
+        return pd.read_csv(cache_path)
+
+    response = SESSION.get(url, headers=headers, timeout=10, stream=False)
+    response.raise_for_status()
+
+    # Only cache responses that are actually the constituent CSV, not block or error pages
+    df = pd.read_csv(StringIO(response.content.decode("utf-8")))
+    if 'Symbol' not in df.columns:
+        raise ValueError(f"Response from {url} is not a constituent CSV")
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp_path, cache_path)
+
+    return df
 
 def get_tickers():
     """
     Retrieve all tickers in NIFTY 500 automatically.
+    The NSE constituent list is cached on disk for a week.
     Returns:
         list: List of ticker symbols with .NS suffix for NSE.
     """
+    return list(_fetch_tickers())
+
+@functools.lru_cache(maxsize=1)
+def _fetch_tickers():
+    """
+    Fetch tickers once per process; see get_tickers.
+    Returns:
+        tuple: Ticker symbols with .NS suffix for NSE.
+    """
     try:
         # Method 1: Fetch from NSE India website
         print("Fetching NIFTY 200 constituents from NSE India...")
         url = "https://www.niftyindices.com/IndexConstituent/ind_nifty200list.csv"
         headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept-Encoding': 'gzip'
         }
-
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        cache_path = os.path.join(CACHE_DIR, "nifty200.csv")
 
         # Read CSV data
-        df = pd.read_csv(StringIO(response.text))
+        df = fetch_constituents_csv(url, headers, cache_path)
 
         # Extract symbols and add .NS suffix for Yahoo Finance
         symbols = df['Symbol'].tolist()
         tickers = [f"{symbol}.NS" for symbol in symbols]
 
+        tickers = tuple(dict.fromkeys(tickers))
         print(f"Successfully fetched {len(tickers)} tickers from NIFTY 500")
         return tickers
 
@@ -43,13 +119,18 @@ def get_tickers():
             print("Trying Wikipedia as fallback...")
             url = "https://en.wikipedia.org/wiki/NIFTY_500"
 
-            tables = pd.read_html(url)
+            response = SESSION.get(url, timeout=10)
+            response.raise_for_status()
+            tables = pd.read_html(StringIO(response.text))
             # Find the table with company symbols
             for table in tables:
                 if 'Symbol' in table.columns or 'Ticker' in table.columns:
                     symbol_col = 'Symbol' if 'Symbol' in table.columns else 'Ticker'
-                    symbols = table[symbol_col].dropna().tolist()
-                    tickers = [f"{symbol}.NS" for symbol in symbols if isinstance(symbol, str)]
+                    symbols = table[symbol_col].dropna()
+                    # Skip columns that are not all strings, such as numeric BSE codes
+                    if pd.api.types.infer_dtype(symbols, skipna=True) != 'string':
+                        continue
+                    tickers = tuple(dict.fromkeys((symbols + '.NS').tolist()))
 
                     if len(tickers) > 100:  # Sanity check
                         print(f"Successfully fetched {len(tickers)} tickers from Wikipedia")
@@ -62,43 +143,223 @@ def get_tickers():
             print("Please install required packages: pip install requests lxml html5lib")
             raise Exception("Failed to fetch tickers from all sources")
 
-def get_ohlcv_data(tickers, start_date, end_date, interval="1d"):
+def to_record_batch(ticker, stock_data):
+    """
+    Convert one ticker's OHLCV data to an Arrow record batch.
+    Args:
+        ticker (str): Ticker symbol.
+        stock_data (pd.DataFrame): Date-indexed OHLCV data for the ticker.
+    Returns:
+        pa.RecordBatch: Record batch matching OHLCV_SCHEMA.
+    """
+    n_rows = len(stock_data)
+    # Ticker is stored once in the dictionary rather than once per row
+    ticker_col = pa.DictionaryArray.from_arrays(np.zeros(n_rows, dtype=np.int32), pa.array([ticker]))
+    date_col = pa.array(stock_data.index.to_numpy(dtype='datetime64[ns]'), type=pa.timestamp('ns'))
+    price_cols = [pa.array(stock_data[col].to_numpy(dtype=np.float32)) for col in PRICE_COLS]
+    volume_col = pa.array(stock_data['Volume'].to_numpy(dtype=np.int64))
+
+    return pa.RecordBatch.from_arrays([ticker_col, date_col, *price_cols, volume_col], schema=OHLCV_SCHEMA)
+
+def to_multi_index(table):
+    """
+    Build a (Ticker, Date) multi-index from an Arrow table.
+    Args:
+        table (pa.Table): Table with Ticker and Date columns.
+    Returns:
+        pd.MultiIndex: Multi-index with Ticker and Date levels.
+    """
+    # Order the ticker categories by name so index order matches a lexical sort
+    tickers = table['Ticker'].to_pandas().cat.remove_unused_categories()
+    tickers = tickers.cat.reorder_categories(sorted(tickers.cat.categories))
+    return pd.MultiIndex.from_arrays([tickers, table['Date'].to_pandas()], names=['Ticker', 'Date'])
+
+def read_ohlcv_table(file_path, columns=None, filters=None):
+    """
+    Read an OHLCV Parquet file as an Arrow table matching OHLCV_SCHEMA.
+    Args:
+        file_path (str): Path to the Parquet file.
+        columns (list): Columns to read. Defaults to all OHLCV_SCHEMA columns.
+        filters (list): Optional Parquet row filters.
+    Returns:
+        pa.Table: Table with the requested OHLCV_SCHEMA columns and types.
+    """
+    columns = columns or OHLCV_SCHEMA.names
+    schema = pa.schema([OHLCV_SCHEMA.field(col) for col in columns])
+    table = pq.read_table(file_path, columns=columns, filters=filters or None)
+    return table.select(columns).cast(schema)
+
+def last_saved_bars(file_path, interval):
+    """
+    Get the saved date range and last bar for each ticker in an existing OHLCV Parquet file.
+    Args:
+        file_path (str): Path to the Parquet file.
+        interval (str): Data interval the saved bars must have been downloaded with.
+    Returns:
+        pd.DataFrame: Start (first saved date), Date and Close of the last saved bar,
+        indexed by ticker. Empty if the file does not exist or has a different interval.
+    """
+    if not os.path.exists(file_path):
+        return pd.DataFrame(columns=['Start', 'Date', 'Close'])
+
+    metadata = pq.read_schema(file_path).metadata or {}
+    if metadata.get(INTERVAL_METADATA_KEY) != interval.encode():
+        print(f"Saved data in '{file_path}' was not downloaded at interval {interval}, ignoring it")
+        return pd.DataFrame(columns=['Start', 'Date', 'Close'])
+
+    table = read_ohlcv_table(file_path, columns=['Ticker', 'Date', 'Close'])
+    bars = pd.DataFrame({'Close': table['Close'].to_numpy()}, index=to_multi_index(table))
+    bars = bars.sort_index().reset_index(level='Date')
+    return bars.groupby(level='Ticker', observed=True).agg(
+        Start=('Date', 'min'), Date=('Date', 'max'), Close=('Close', 'last')
+    )
+
+def get_ohlcv_data(tickers, start_date, end_date, interval="1d", max_workers=8):
     """
     Fetch OHLCV data for given tickers using yfinance.
+    Each ticker is streamed to disk and released as soon as it is written,
+    so downloaded tickers are not accumulated in memory.
+    If 'ohlcv_data.parquet' already exists, each saved ticker is downloaded
+    again from its last saved bar. If that bar's adjusted close has changed
+    (a split or dividend since the last save), the ticker's full history is
+    downloaded instead of appending to stale adjusted prices.
+    Saved rows are only reused when they were downloaded at the same interval
+    and already cover start_date; otherwise the ticker is downloaded in full.
+    Saved rows before start_date are dropped.
     Args:
         tickers (list): List of ticker symbols.
         start_date (str): Start date in 'YYYY-MM-DD' format.
         end_date (str): End date in 'YYYY-MM-DD' format.
         interval (str): Data interval.
+        max_workers (int): Number of concurrent download threads.
     Returns:
         pd.DataFrame: DataFrame containing OHLCV data in multi-index format.
-    Saves the data to 'ohlcv_data.csv'.
+    Saves the data to 'ohlcv_data.parquet'.
     """
     print(f"Fetching OHLCV data for {len(tickers)} tickers...")
-    data = pd.DataFrame()
+    file_path = "ohlcv_data.parquet"
+    raw_path = "ohlcv_data.raw.parquet"
+
+    tickers = list(dict.fromkeys(tickers))
+    requested = set(tickers)
+    saved = {
+        ticker: (bar['Date'], bar['Close'])
+        for ticker, bar in last_saved_bars(file_path, interval).iterrows()
+        if ticker in requested and bar['Start'] <= pd.Timestamp(start_date)
+    }
+
+    pending = [ticker for ticker in tickers
+               if ticker not in saved or saved[ticker][0] + pd.Timedelta(days=1) < pd.Timestamp(end_date)]
+    print(f"Skipping {len(tickers) - len(pending)} tickers that are already up to date")
+
+    def fetch(ticker, start):
+        # yf.download shares module-level state between calls, so each thread
+        # uses its own Ticker instance instead.
+        # Like yf.download, a failed ticker yields an empty frame rather than
+        # aborting the run; rate limits are retried with exponential backoff.
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                # auto_adjust folds Adj Close into Close so it never needs dropping
+                stock_data = yf.Ticker(ticker).history(start=start, end=end_date, interval=interval,
+                                                       auto_adjust=True, actions=False)
+                break
+            except YFRateLimitError:
+                if attempt == RATE_LIMIT_RETRIES:
+                    print(f"Rate limited while fetching {ticker}, giving up")
+                    return pd.DataFrame()
+                time.sleep(RATE_LIMIT_BACKOFF * 2 ** attempt)
+            except Exception as e:
+                print(f"Error fetching data for {ticker}: {e}")
+                return pd.DataFrame()
 
-    for ticker in tickers:
+        # Keep exchange-local timestamps, matching yf.download
+        if getattr(stock_data.index, 'tz', None) is not None:
+            stock_data.index = stock_data.index.tz_localize(None)
+        return stock_data
+
+    # Returns the ticker's new bars and whether its full history was refetched
+    def download(ticker):
         print(f"Fetching data for {ticker}...")
-        stock_data = yf.download(ticker, start=start_date, end=end_date, interval=interval, multi_level_index=False)
-        stock_data['Ticker'] = ticker
-        data = pd.concat([data, stock_data])
+        if ticker not in saved:
+            return fetch(ticker, start_date), False
+
+        # Resume from the last saved bar so it can be compared with Yahoo's current value
+        last_date, last_close = saved[ticker]
+        stock_data = fetch(ticker, last_date)
+        if stock_data.empty:
+            return stock_data, False
 
-    # Drop Adjusted Close if exists
-    if 'Adj Close' in data.columns:
-        data = data.drop(columns=['Adj Close'])
+        # Yahoo back-adjusts the whole history after a split or dividend, so
+        # appending to the saved rows would introduce a fake price jump
+        if stock_data.index[0] != last_date or not np.isclose(stock_data['Close'].iloc[0], last_close, rtol=1e-5):
+            print(f"Adjusted prices changed for {ticker}, refetching full history...")
+            full_data = fetch(ticker, start_date)
+            if full_data.empty:
+                # Keep the saved rows rather than losing the ticker's history
+                print(f"Full refetch failed for {ticker}, keeping saved data")
+                return full_data, False
+            return full_data, True
 
-    # Set multi-index
-    data.index.name = 'Date'
-    data = data.set_index('Ticker', append=True)
-    data = data.reorder_levels(['Ticker', 'Date'])
+        return stock_data, False
 
-    # Filter out tickers with insufficient data
-    bust_tickers = filter_tickers(data, min_start_date="2009-02-01")
-    data = data.drop(index=bust_tickers, level='Ticker')
+    refetched = set()
+    try:
+        # Downloads are network-bound, so fetch tickers concurrently.
+        # executor.map drops each result once it has been yielded and written.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                pq.ParquetWriter(raw_path, OHLCV_SCHEMA, compression="zstd") as writer:
+            for ticker, (stock_data, full_history) in zip(pending, executor.map(download, pending)):
+                if full_history:
+                    refetched.add(ticker)
+                if stock_data.empty:
+                    print(f"No data returned for {ticker}")
+                    continue
+                writer.write_batch(to_record_batch(ticker, stock_data))
 
-    # Save to CSV
-    data.to_csv("ohlcv_data.csv")
-    print("OHLCV data saved to 'ohlcv_data.csv'")
+        # Saved rows are kept only for tickers whose adjusted prices are unchanged.
+        # They come first so a re-downloaded boundary bar takes precedence.
+        carried = [ticker for ticker in saved if ticker not in refetched]
+        sources = [(file_path, [('Ticker', 'in', carried), ('Date', '>=', pd.Timestamp(start_date))])] if carried else []
+        sources.append((raw_path, []))
+
+        # Filter out tickers with insufficient data, reading only the index columns
+        index_table = pa.concat_tables(
+            [read_ohlcv_table(path, columns=['Ticker', 'Date'], filters=filters) for path, filters in sources]
+        )
+        bust_tickers = filter_tickers(pd.DataFrame(index=to_multi_index(index_table)), min_start_date="2009-02-01")
+        exclude = [('Ticker', 'not in', bust_tickers)] if bust_tickers else []
+        table = pa.concat_tables(
+            [read_ohlcv_table(path, filters=filters + exclude) for path, filters in sources]
+        )
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    # Sort in Arrow (stable, so saved rows stay ahead of new ones) so pandas
+    # never has to copy the frame to sort it. Arrow can't sort dictionary
+    # columns, so the order is computed on a decoded Ticker key.
+    sort_key = pa.table({'Ticker': table['Ticker'].cast(pa.string()), 'Date': table['Date']})
+    order = pc.sort_indices(sort_key, sort_keys=[('Ticker', 'ascending'), ('Date', 'ascending')])
+    table = table.take(order)
+
+    # Build the multi-index directly from the Arrow columns, then convert the
+    # value columns without block consolidation, releasing Arrow buffers as we go
+    index = to_multi_index(table)
+    table = table.select(PRICE_COLS + ['Volume'])
+    data = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    data.index = index
+
+    # Yahoo may return the boundary bar again; keep the newest copy
+    duplicated = data.index.duplicated(keep='last')
+    if duplicated.any():
+        data = data[~duplicated]
+
+    # Save to Parquet, recording the interval so later updates can check it
+    table = pa.Table.from_pandas(data)
+    metadata = {**table.schema.metadata, INTERVAL_METADATA_KEY: interval.encode()}
+    pq.write_table(table.replace_schema_metadata(metadata), file_path, compression="zstd")
+    print("OHLCV data saved to 'ohlcv_data.parquet'")
 
     return data
 
@@ -111,13 +372,8 @@ def filter_tickers(data, min_start_date="2009-02-01"):
     Returns:
         list: List of tickers that do not meet the criteria.
     """
-    bust_tickers = []
-    grouped = data.groupby(level='Ticker')
-
-    for ticker, group in grouped:
-        min_date = group.index.get_level_values('Date').min()
-        if min_date > pd.to_datetime(min_start_date):
-            bust_tickers.append(ticker)
+    min_dates = data.index.to_frame(index=False).groupby('Ticker', observed=True)['Date'].min()
+    bust_tickers = min_dates.index[min_dates > pd.to_datetime(min_start_date)].tolist()
 
     print(f"Total tickers with min date after {min_start_date}: {len(bust_tickers)}")
     return bust_tickers
@@ -1,21 +1,33 @@
 """
 Module for creating technical features and execution price for OHLCV data.
+
+Optional dependency: numba (pip install numba) speeds up the execution price
+calculation. Without it, DataFrame.eval is used instead.
 """
 
 import pandas as pd
 import ta
 import numpy as np
 
-def load_ohlcv_data(file_path):
+try:
+    import numba
+except ImportError:
+    numba = None
+
+def load_ohlcv_data(file_path="ohlcv_data.parquet"):
     """
-    Load OHLCV data from a CSV file.
+    Load OHLCV data from a Parquet file.
+    Legacy CSV files are still supported.
     Args:
-        file_path (str): Path to the CSV file.
+        file_path (str): Path to the Parquet or CSV file.
     Returns:
         pd.DataFrame: Multi-index DataFrame with OHLCV data.
     """
 
-    df = pd.read_csv("ohlcv_data.csv", index_col=[1, 0])
+    if file_path.endswith(".csv"):
+        df = pd.read_csv(file_path, index_col=[0, 1], parse_dates=['Date'])
+    else:
+        df = pd.read_parquet(file_path)
     return df
 
 def add_technical_indicators(df):
@@ -29,7 +41,21 @@ def add_technical_indicators(df):
 
     pass
 
-def add_execution_price(df, spread_coeff=0.1, sigma_noise=0.005):
+if numba is not None:
+    # error_model='numpy' makes zero division give inf/NaN like the pandas path,
+    # and no fastmath so NaN bars are handled correctly
+    @numba.njit(parallel=True, error_model='numpy')
+    def _exec_price(high, low, noise, spread_coeff):
+        """
+        Compute execution prices from high, low and noise arrays in one pass.
+        """
+        out = np.empty_like(high)
+        for i in numba.prange(high.shape[0]):
+            mid = 0.5 * (high[i] + low[i])
+            out[i] = mid + 0.5 * spread_coeff * (high[i] - low[i]) / mid + noise[i]
+        return out
+
+def add_execution_price(df, spread_coeff=0.1, sigma_noise=0.005, rng=None):
     """
     Add execution price to the OHLCV DataFrame.
     There are two components to the execution price:
@@ -40,21 +66,35 @@ def add_execution_price(df, spread_coeff=0.1, sigma_noise=0.005):
         df (pd.DataFrame): Multi-index DataFrame with OHLCV data.
         spread_coeff (float): Coefficient to estimate spread.
         sigma_noise (float): Standard deviation of noise to add.
+        rng (np.random.Generator): Random generator for the noise. Defaults to a generator seeded with 42.
     Returns:
         pd.DataFrame: DataFrame with added execution price.
     """
 
-    df['Mid'] = (df['High'] + df['Low']) / 2
-    df['Spread_est'] = spread_coeff * (df['High'] - df['Low']) / df['Mid']
+    high = np.ascontiguousarray(df['High'].to_numpy())
+    low = np.ascontiguousarray(df['Low'].to_numpy())
+
+    if rng is None:
+        rng = np.random.default_rng(42)  # For reproducibility
+    # Always draw float64 so a seed gives the same noise for float32 and float64 prices
+    noise = (rng.standard_normal(len(df)) * sigma_noise).astype(high.dtype, copy=False)
 
-    np.random.seed(42)  # For reproducibility
-    noise = np.random.normal(0, sigma_noise, size=len(df))
+    # Compute on raw arrays so mid and spread never become DataFrame columns
+    if numba is not None:
+        execution_price = _exec_price(high, low, noise, spread_coeff)
+    else:
+        # Without Numba, let numexpr fuse the expression into a single pass
+        # (spread_coeff * (High - Low) / (High + Low) is half the spread over mid)
+        execution_price = df.eval(
+            "(High + Low) / 2 + @spread_coeff * (High - Low) / (High + Low) + @noise"
+        ).to_numpy(copy=True)
 
-    df['Execution Price'] = df['Mid'] + (df['Spread_est'] / 2) + noise
-    df['Execution Price'] = df['Execution Price'].clip(lower=0)
+    # Negative prices are practically impossible, so only write back when present
+    negative = execution_price < 0
+    if negative.any():
+        execution_price[negative] = 0
 
-    # Drop intermediate columns
-    df = df.drop(columns=['Mid', 'Spread_est'])
+    df['Execution Price'] = execution_price
 
     return df
 
@@ -62,7 +102,7 @@ def get_features(file_path):
     """
     Load OHLCV data and add technical indicators and execution price.
     Args:
-        file_path (str): Path to the CSV file.
+        file_path (str): Path to the Parquet or CSV file.
     Returns:
         pd.DataFrame: DataFrame with technical indicators and execution price.
     Saves the data to 'features.csv'.